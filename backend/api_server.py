@@ -9,7 +9,7 @@ from logging.config import dictConfig
 from typing import Any, Optional
 import socketio
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
@@ -43,13 +43,16 @@ async def lifespan(app: FastAPI):
     yield
     logger.info("Shutting down ProTrade Terminal...")
     try:
-        data_engine.flush_tick_buffer()
+        data_engine.stop_tick_writer()
     except Exception as e:
-        logger.error(f"Error flushing tick buffers: {e}")
+        logger.error(f"Error stopping tick writer: {e}")
+    if search_client is not None:
+        await search_client.aclose()
 
 fastapi_app = FastAPI(title="ProTrade API", lifespan=lifespan)
 sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*', ping_timeout=60, ping_interval=25)
 main_loop = None
+search_client = None # httpx.AsyncClient for the symbol search proxy, created on first use
 
 fastapi_app.add_middleware(
     CORSMiddleware,
@@ -88,14 +91,18 @@ async def handle_load_indicators(sid, data):
 
     try:
         extractor = data_engine.start_extractor()
-        extractor.resolve_symbol(symbol)
-        extractor.create_series(timeframe=data.get('timeframe', '1D'))
-
-        for i, ind in enumerate(indicators):
-            meta = await asyncio.to_thread(extractor.get_indicator_metadata, ind['id'])
-            study_id = f"st_{sid}_{i}"
-            extractor.create_study(study_id, meta, custom_inputs=ind.get('inputs'))
-            logger.info(f"Loaded indicator {ind['id']} with study_id {study_id}")
+        # Metadata requests are independent; the extractor overlaps their round trips
+        metas_by_id = await asyncio.to_thread(extractor.get_indicator_metadata_many, [ind['id'] for ind in indicators])
+        metas = [metas_by_id[ind['id']] for ind in indicators]
+
+        # Symbol, series and studies are sent to TradingView as one frame
+        with extractor.batched():
+            extractor.resolve_symbol(symbol)
+            extractor.create_series(timeframe=data.get('timeframe', '1D'))
+            for i, (ind, meta) in enumerate(zip(indicators, metas)):
+                study_id = f"st_{sid}_{i}"
+                extractor.create_study(study_id, meta, custom_inputs=ind.get('inputs'))
+                logger.info(f"Loaded indicator {ind['id']} with study_id {study_id}")
 
     except Exception as e:
         logger.error(f"Error loading indicators for {sid}: {e}")
@@ -114,10 +121,14 @@ async def tv_search(text: str = Query(..., min_length=1)):
         'Referer': 'https://in.tradingview.com/',
         'Origin': 'https://in.tradingview.com'
     }
+    global search_client
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers, timeout=10.0)
-            return response.json()
+        # One pooled client keeps the connection to symbol-search alive across keystrokes
+        if search_client is None:
+            search_client = httpx.AsyncClient()
+        response = await search_client.get(url, headers=headers, timeout=10.0)
+        # Pass the JSON body through untouched instead of decoding and re-encoding it
+        return Response(content=response.content, status_code=response.status_code, media_type="application/json")
     except Exception as e:
         logger.error(f"Search proxy error: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch search results")
@@ -5,13 +5,19 @@ Manages real-time data ingestion and OHLC aggregation.
 import asyncio
 import json
 import logging
+import queue
 import threading
 import time
 from datetime import datetime
 from typing import Dict, Any, List, Optional, Union
-from db.local_db import db, LocalDBJSONEncoder
+from db.local_db import db, encode_json
 from core.symbol_mapper import symbol_mapper
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 # Configuration
@@ -23,55 +29,154 @@ except ImportError:
 socketio_instance = None
 main_event_loop = None
 latest_total_volumes = {}
+_today_ord = 0
+_today_str = ""
 
 TICK_BATCH_SIZE = 100
-tick_buffer = []
-buffer_lock = threading.Lock()
+TICK_FLUSH_INTERVAL = 1.0 # seconds a partial batch may wait before it is written
+_tick_queue = queue.SimpleQueue()
+
+RAW_TICK_INTERVAL_NS = 100_000_000 # minimum gap between raw_tick broadcasts
+_pending_ticks: Dict[str, Any] = {} # hrn -> latest feed_datum awaiting broadcast
+_pending_lock = threading.Lock()
+_raw_tick_wakeup = None
+_wakeup_scheduled = False
 
 def set_socketio(sio, loop=None):
-    global socketio_instance, main_event_loop
+    global socketio_instance, main_event_loop, _raw_tick_wakeup
     socketio_instance = sio
     main_event_loop = loop
+    if loop:
+        _raw_tick_wakeup = asyncio.Event()
+        asyncio.run_coroutine_threadsafe(_raw_tick_writer(), loop)
+
+def _prepare_payload(data: Any) -> Any:
+    if isinstance(data, (dict, list)):
+        # Serialize once and ship the JSON text; clients parse string payloads.
+        data = encode_json(data)
+        if isinstance(data, bytes): data = data.decode()
+    return data
 
 def emit_event(event: str, data: Any, room: Optional[str] = None):
     global socketio_instance, main_event_loop
     if not socketio_instance: return
-    if isinstance(data, (dict, list)):
-        data = json.loads(json.dumps(data, cls=LocalDBJSONEncoder))
+    data = _prepare_payload(data)
     try:
         if main_event_loop and main_event_loop.is_running():
             asyncio.run_coroutine_threadsafe(socketio_instance.emit(event, data, room=room), main_event_loop)
     except Exception as e:
         logger.error(f"Emit Error: {e}")
 
-def flush_tick_buffer():
-    global tick_buffer
-    to_insert = []
-    with buffer_lock:
-        if tick_buffer:
-            to_insert = tick_buffer
-            tick_buffer = []
-    if to_insert:
+def _insert_ticks(batch: List[Dict[str, Any]]):
+    try:
+        db.insert_ticks(batch)
+    except Exception as e:
+        logger.error(f"DB Insert Error: {e}")
+
+_STOP = object() # queued by stop_tick_writer; the writer finishes its batch and exits
+
+def _tick_consumer():
+    """Long-lived writer: drains the tick queue into the DB in batches."""
+    while True:
+        item = _tick_queue.get()
+        if item is _STOP: return
+        batch = [item]
+        stop = False
+        deadline = time.monotonic() + TICK_FLUSH_INTERVAL
+        while len(batch) < TICK_BATCH_SIZE:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0: break
+            try:
+                item = _tick_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stop = True
+                break
+            batch.append(item)
+        _insert_ticks(batch)
+        if stop: return
+
+_consumer_thread = threading.Thread(target=_tick_consumer, name="tick-writer", daemon=True)
+_consumer_thread.start()
+
+def stop_tick_writer():
+    """Shutdown only: stops the writer once it has written every buffered tick, then writes any stragglers.
+
+    The writer is not restarted, so ticks queued afterwards are never written.
+    """
+    if _consumer_thread.is_alive():
+        # The sentinel queues behind pending ticks, so the writer's in-hand batch and the queue are written first
+        _tick_queue.put(_STOP)
+        _consumer_thread.join()
+    batch = []
+    while True:
+        try:
+            item = _tick_queue.get_nowait()
+        except queue.Empty:
+            break
+        if item is not _STOP: batch.append(item)
+    if batch:
+        _insert_ticks(batch)
+
+_last_emit_ns = 0
+
+def _queue_raw_ticks(hrn_feeds: Dict[str, Any]):
+    """Merges feeds into the pending raw_tick frame and wakes the writer once."""
+    global _wakeup_scheduled
+    if _raw_tick_wakeup is None: return
+    with _pending_lock:
+        _pending_ticks.update(hrn_feeds)
+        if _wakeup_scheduled: return
+        _wakeup_scheduled = True
+    try:
+        main_event_loop.call_soon_threadsafe(_raw_tick_wakeup.set)
+    except RuntimeError as e:
+        logger.error(f"Emit Error: {e}")
+
+async def _raw_tick_writer():
+    """Sends everything that accumulated since the last raw_tick as one frame."""
+    global _pending_ticks, _wakeup_scheduled, _last_emit_ns
+    while True:
+        await _raw_tick_wakeup.wait()
+        _raw_tick_wakeup.clear()
+
+        # Throttle: ticks arriving meanwhile are merged into the next frame
+        wait_ns = RAW_TICK_INTERVAL_NS - (time.monotonic_ns() - _last_emit_ns)
+        if wait_ns > 0: await asyncio.sleep(wait_ns / 1e9)
+
+        with _pending_lock:
+            batch, _pending_ticks = _pending_ticks, {}
+            _wakeup_scheduled = False
+        if not batch: continue
         try:
-            db.insert_ticks(to_insert)
+            await socketio_instance.emit('raw_tick', _prepare_payload(batch))
         except Exception as e:
-            logger.error(f"DB Insert Error: {e}")
+            logger.error(f"Emit Error: {e}")
+        _last_emit_ns = time.monotonic_ns()
 
-last_emit_times = {}
-
-def on_message(message: Union[Dict, str]):
-    global tick_buffer
+def on_message(message: Union[Dict, str, bytes]):
+    global _today_ord, _today_str
     try:
-        data = json.loads(message) if isinstance(message, str) else message
+        if isinstance(message, (str, bytes)):
+            data = orjson.loads(message) if orjson else json.loads(message)
+        else:
+            data = message
         feeds_map = data.get('feeds', {})
         if not feeds_map: return
 
+        # Date string only changes at midnight; reformat when the ordinal moves
         current_time = datetime.now()
+        today_ord = current_time.toordinal()
+        if today_ord != _today_ord:
+            _today_ord = today_ord
+            _today_str = f"{current_time.year:04d}-{current_time.month:02d}-{current_time.day:02d}"
+        today_str = _today_str
+        get_hrn = symbol_mapper.get_hrn
         hrn_feeds = {}
-        today_str = current_time.strftime("%Y-%m-%d")
 
         for inst_key, feed_datum in feeds_map.items():
-            hrn = symbol_mapper.get_hrn(inst_key)
+            hrn = get_hrn(inst_key)
             feed_datum['instrumentKey'] = hrn
             feed_datum['date'] = today_str
             hrn_feeds[hrn] = feed_datum
@@ -91,23 +196,19 @@ def on_message(message: Union[Dict, str]):
 
                 # Volume Logic (Delta calculation)
                 delta_vol = 0
-                if feed_datum.get('tv_volume') is not None:
-                    curr_vol = float(feed_datum['tv_volume'])
-                    if hrn in latest_total_volumes:
-                        delta_vol = max(0, curr_vol - latest_total_volumes[hrn])
+                tv_volume = feed_datum.get('tv_volume')
+                if tv_volume is not None:
+                    curr_vol = float(tv_volume)
+                    prev_vol = latest_total_volumes.get(hrn, curr_vol)
+                    if curr_vol > prev_vol: delta_vol = int(curr_vol - prev_vol)
                     latest_total_volumes[hrn] = curr_vol
-                feed_datum['ltq'] = int(delta_vol)
-
-        # Throttled UI Emission
-        now = time.time()
-        if now - last_emit_times.get('GLOBAL_TICK', 0) > 0.1:
-            emit_event('raw_tick', hrn_feeds)
-            last_emit_times['GLOBAL_TICK'] = now
-
-        with buffer_lock:
-            tick_buffer.extend(list(hrn_feeds.values()))
-            if len(tick_buffer) >= TICK_BATCH_SIZE:
-                threading.Thread(target=flush_tick_buffer, daemon=True).start()
+                feed_datum['ltq'] = delta_vol
+
+        # Coalesced, throttled UI emission
+        _queue_raw_ticks(hrn_feeds)
+
+        for feed_datum in hrn_feeds.values():
+            _tick_queue.put_nowait(feed_datum)
     except Exception as e:
         logger.error(f"Error in data_engine on_message: {e}")
 
@@ -121,8 +222,9 @@ def on_extractor_data(data: Dict[str, Any]):
     # Send to Strategy Engine
     from core.strategy_engine import strategy_engine
     if strategy_engine:
+        study_rows = extractor_instance.study_rows if extractor_instance else {}
         for study_id, mapped_data in data.get('indicators', {}).items():
-            strategy_engine.on_indicator_update(study_id, mapped_data)
+            strategy_engine.on_indicator_update(study_id, mapped_data, study_rows.get(study_id))
 
     # Also log if there's significant graphical data
     if data.get('graphics'):
@@ -148,9 +250,11 @@ def start_extractor(cookies: Optional[Any] = None):
         extractor_instance.token = user_data["auth_token"]
         logger.info(f"Extractor authenticated as {user_data.get('username')}")
 
-    extractor_instance.connect()
+    # Auth + session creation go out as one frame
+    with extractor_instance.batched():
+        extractor_instance.connect()
+        extractor_instance.create_chart_session()
     threading.Thread(target=extractor_instance.listen, daemon=True).start()
-    extractor_instance.create_chart_session()
 
     return extractor_instance
 
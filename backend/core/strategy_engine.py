@@ -1,7 +1,7 @@
 import logging
 import threading
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +22,11 @@ class StrategyEngine:
         # For this sample, we just poll the latest data or subscribe to updates
         pass
 
-    def on_indicator_update(self, study_id: str, mapped_data: list):
-        """Called when new indicator data is available."""
+    def on_indicator_update(self, study_id: str, mapped_data: list, series: Optional[Any] = None):
+        """
+        Called when new indicator data is available.
+        `series` is the study's RowBuffer of numeric plot values, when the extractor keeps one.
+        """
         if not mapped_data:
             return
 
@@ -32,7 +35,9 @@ class StrategyEngine:
 
         # Sample logic: Log a trade signal if RSI (or similar) exceeds a threshold
         # Assuming the indicator has an 'RSI' plot or similar
-        rsi_val = latest.get('RSI') or latest.get('plot_0')
+        rsi_val = series.latest('RSI') if series is not None else None
+        if rsi_val is None:
+            rsi_val = latest.get('RSI') or latest.get('plot_0')
         if isinstance(rsi_val, (int, float)):
             if rsi_val > 70:
                 logger.warning(f"SIGNAL: Overbought detected for {study_id} (Value: {rsi_val})")
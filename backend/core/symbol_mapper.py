@@ -1,4 +1,5 @@
 
+import functools
 import logging
 import pandas as pd
 from datetime import datetime
@@ -7,6 +8,8 @@ from db.local_db import db
 
 logger = logging.getLogger(__name__)
 
+UNMAPPED_CACHE_SIZE = 4096 # instrument keys without a stored mapping whose fallback HRN is memoized
+
 class SymbolMapper:
     _instance = None
     _mapping_cache: Dict[str, str] = {
@@ -39,7 +42,16 @@ class SymbolMapper:
 
         if key in self._mapping_cache:
             return self._mapping_cache[key]
+        if metadata is None:
+            # Unmapped keys recur on every tick; remember their fallback until a mapping is stored
+            return self._unmapped_hrn(key)
+        return self._resolve_hrn(key, metadata)
+
+    @functools.lru_cache(maxsize=UNMAPPED_CACHE_SIZE)
+    def _unmapped_hrn(self, key: str) -> str:
+        return self._resolve_hrn(key, None)
 
+    def _resolve_hrn(self, key: str, metadata: Optional[Dict[str, Any]]) -> str:
         # Try to find in Local DB
         try:
             res = db.get_metadata(key)
@@ -105,6 +117,8 @@ class SymbolMapper:
             pass
         self._mapping_cache[instrument_key] = hrn
         self._reverse_cache[hrn] = instrument_key
+        # A fallback name may have been cached for this key before its mapping was known
+        self._unmapped_hrn.cache_clear()
 
     def resolve_to_key(self, hrn: str) -> Optional[str]:
         """Resolves a Human Readable Name back to an instrument key."""
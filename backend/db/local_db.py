@@ -3,6 +3,7 @@ DuckDB-based Local Database implementation.
 Provides an optimized columnar data store for high-frequency tick data.
 """
 import duckdb
+import functools
 import os
 import json
 import logging
@@ -11,6 +12,11 @@ from typing import List, Dict, Any, Optional
 import threading
 import pandas as pd
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 class LocalDBJSONEncoder(json.JSONEncoder):
@@ -18,6 +24,17 @@ class LocalDBJSONEncoder(json.JSONEncoder):
         if isinstance(obj, datetime): return obj.isoformat()
         return super().default(obj)
 
+if orjson:
+    # Returns bytes; orjson serializes numpy values and non-str keys natively
+    encode_json = functools.partial(orjson.dumps, default=LocalDBJSONEncoder().default,
+                                    option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+else:
+    encode_json = functools.partial(json.dumps, cls=LocalDBJSONEncoder)
+
+def _to_json(obj) -> str:
+    data = encode_json(obj)
+    return data.decode() if isinstance(data, bytes) else data
+
 DB_PATH = os.getenv('DUCKDB_PATH', 'pro_trade.db')
 
 class LocalDB:
@@ -64,19 +81,17 @@ class LocalDB:
 
     def insert_ticks(self, ticks: List[Dict[str, Any]]):
         if not ticks: return
-        data = []
-        for t in ticks:
-            price = t.get('last_price', 0)
-            qty = t.get('ltq', 0)
-            data.append({
-                'date': t.get('date', datetime.now().strftime('%Y-%m-%d')),
-                'instrumentKey': t.get('instrumentKey'),
-                'ts_ms': int(t.get('ts_ms', 0)),
-                'price': float(price),
-                'qty': int(qty),
-                'source': t.get('source', 'live'),
-                'full_feed': json.dumps(t, cls=LocalDBJSONEncoder)
-            })
+        # Build the frame column-wise (SoA) rather than from one dict per row
+        today = datetime.now().strftime('%Y-%m-%d')
+        data = {
+            'date': [t.get('date', today) for t in ticks],
+            'instrumentKey': [t.get('instrumentKey') for t in ticks],
+            'ts_ms': [int(t.get('ts_ms', 0)) for t in ticks],
+            'price': [float(t.get('last_price', 0)) for t in ticks],
+            'qty': [int(t.get('ltq', 0)) for t in ticks],
+            'source': [t.get('source', 'live') for t in ticks],
+            'full_feed': [_to_json(t) for t in ticks],
+        }
 
         df = pd.DataFrame(data)
         with self._execute_lock:
@@ -87,7 +102,7 @@ class LocalDB:
                 self._batch_count = 0
 
     def update_metadata(self, instrument_key: str, hrn: str, meta: Dict[str, Any]):
-        meta_json = json.dumps(meta)
+        meta_json = _to_json(meta)
         with self._execute_lock:
             self.conn.execute("""
                 INSERT OR REPLACE INTO metadata (instrument_key, hrn, meta, updated_at)
@@ -97,7 +112,7 @@ class LocalDB:
     def get_metadata(self, instrument_key: str) -> Optional[Dict[str, Any]]:
         with self._execute_lock:
             res = self.conn.execute("SELECT hrn, meta FROM metadata WHERE instrument_key = ?", (instrument_key,)).fetchone()
-        if res: return {'hrn': res[0], 'metadata': json.loads(res[1])}
+        if res: return {'hrn': res[0], 'metadata': orjson.loads(res[1]) if orjson else json.loads(res[1])}
         return None
 
     def query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
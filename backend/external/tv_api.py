@@ -10,14 +10,16 @@ import os
 import contextlib
 import io
 import time
+import pandas as pd
 
 from datetime import datetime
 import re
 
+# Match pattern: "NIFTY 03 FEB 2026 CALL 25300"
+_OPTION_HRN_RE = re.compile(r"(NIFTY|BANKNIFTY|FINNIFTY)\s+(\d{1,2})\s+([A-Z]{3})\s+(\d{4})\s+(CALL|PUT)\s+(\d+)")
+
 def convert_hrn_to_symbol(symbol_or_hrn):
-    # Match pattern: "NIFTY 03 FEB 2026 CALL 25300"
-    pattern = r"(NIFTY|BANKNIFTY|FINNIFTY)\s+(\d{1,2})\s+([A-Z]{3})\s+(\d{4})\s+(CALL|PUT)\s+(\d+)"
-    match = re.search(pattern, symbol_or_hrn.upper())
+    match = _OPTION_HRN_RE.search(symbol_or_hrn.upper())
 
     if match:
         base, day, month_str, year, opt_type, strike = match.groups()
@@ -136,23 +138,19 @@ class TradingViewAPI:
 
                 df = self.tv.get_hist(symbol=tv_symbol, exchange=tv_exchange, interval=tv_interval, n_bars=n_bars)
                 if df is not None and not df.empty:
-                    candles = []
-                    for ts, row in df.iterrows():
-                        # tvDatafeed returns naive datetime in exchange timezone (usually IST for NSE)
-                        # We need to treat it as IST and get UTC timestamp
-                        import pytz
-                        ist = pytz.timezone('Asia/Kolkata')
-                        try:
-                            ts_ist = ist.localize(ts) if ts.tzinfo is None else ts.astimezone(ist)
-                            unix_ts = int(ts_ist.timestamp())
-                        except:
-                            unix_ts = int(ts.timestamp())
-
-                        candles.append([
-                            unix_ts,
-                            float(row['open']), float(row['high']), float(row['low']), float(row['close']),
-                            float(row['volume'])
-                        ])
+                    # tvDatafeed returns naive datetime in exchange timezone (usually IST for NSE)
+                    # We need to treat it as IST and get UTC timestamp; done for the whole index at once
+                    idx = df.index
+                    try:
+                        idx = idx.tz_localize('Asia/Kolkata') if idx.tz is None else idx.tz_convert('Asia/Kolkata')
+                    except Exception as e:
+                        # Same fallback as Timestamp.timestamp(): naive stamps are read as UTC
+                        logger.warning(f"Could not localize tvDatafeed index to IST, treating it as UTC: {e}")
+                    # Subtracting the epoch works for any datetime64 unit (s/ms/us/ns), unlike raw asi8
+                    epoch = pd.Timestamp(0, tz='UTC') if idx.tz is not None else pd.Timestamp(0)
+                    unix_ts = ((idx - epoch) // pd.Timedelta(seconds=1)).tolist()
+                    values = df[['open', 'high', 'low', 'close', 'volume']].to_numpy(dtype=float).tolist()
+                    candles = [[ts, *vals] for ts, vals in zip(unix_ts, values)]
                     logger.info(f"Retrieved {len(candles)} candles via tvDatafeed")
                     return candles[::-1]
 
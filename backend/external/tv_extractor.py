@@ -1,51 +1,192 @@
+import contextlib
+import hashlib
+import itertools
 import json
-import random
-import string
+import os
+import queue
 import re
+import secrets
 import requests
+from urllib3.util.retry import Retry
 import websocket
 import threading
 import time
 import logging
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from external.tv_framing import is_heartbeat_frame, prepend_header, split_frames
 
 try:
     import rookiepy
 except ImportError:
     rookiepy = None
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson:
+    _loads = orjson.loads
+    _dumpb = orjson.dumps
+    def _dumps(obj):
+        return orjson.dumps(obj).decode()
+else:
+    _loads = json.loads
+    _dumps = json.dumps
+    def _dumpb(obj):
+        return json.dumps(obj).encode()
+
+if msgspec:
+    class Frame(msgspec.Struct):
+        """Protocol message envelope. Fields other than m/p are skipped while decoding."""
+        m: str = ""
+        p: list = []
+
+    _decode_frame = msgspec.json.Decoder(Frame).decode
+else:
+    class Frame:
+        """Protocol message envelope (plain fallback when msgspec is unavailable)."""
+        __slots__ = ("m", "p")
+
+        def __init__(self, m="", p=None):
+            self.m = m
+            self.p = p if p is not None else []
+
+    def _decode_frame(payload):
+        obj = _loads(payload)
+        if not isinstance(obj, dict):
+            raise ValueError("Frame payload is not a JSON object")
+        return Frame(obj.get("m", ""), obj.get("p"))
+
+if msgspec:
+    class EraseCmd(msgspec.Struct):
+        """One graphicsCmds.erase entry: action "all" (optionally per type) or "one" by id."""
+        action: Optional[str] = None
+        type: Optional[str] = None
+        id: Any = None
+
+    class CreateGroup(msgspec.Struct):
+        """One graphicsCmds.create group; only the drawing dicts are kept."""
+        data: List[dict] = []
+
+    class GraphicsCmds(msgspec.Struct):
+        erase: List[EraseCmd] = []
+        create: Dict[str, List[CreateGroup]] = {}
+
+    class NsData(msgspec.Struct):
+        """Decoded ns["d"] graphics payload. Fields other than graphicsCmds are skipped while decoding."""
+        graphicsCmds: Optional[GraphicsCmds] = None
+
+    _decode_ns = msgspec.json.Decoder(NsData).decode
+else:
+    class EraseCmd:
+        __slots__ = ("action", "type", "id")
+
+        def __init__(self, action=None, type=None, id=None):
+            self.action = action
+            self.type = type
+            self.id = id
+
+    class CreateGroup:
+        __slots__ = ("data",)
+
+        def __init__(self, data=None):
+            self.data = data if data is not None else []
+
+    class GraphicsCmds:
+        __slots__ = ("erase", "create")
+
+        def __init__(self, erase=None, create=None):
+            self.erase = erase if erase is not None else []
+            self.create = create if create is not None else {}
+
+    class NsData:
+        __slots__ = ("graphicsCmds",)
+
+        def __init__(self, graphicsCmds=None):
+            self.graphicsCmds = graphicsCmds
+
+    def _decode_ns(payload):
+        cmds = _loads(payload).get("graphicsCmds")
+        if not cmds:
+            return NsData()
+        return NsData(GraphicsCmds(
+            [EraseCmd(e.get("action"), e.get("type"), e.get("id")) for e in cmds.get("erase", [])],
+            {t: [CreateGroup(g.get("data")) for g in groups] for t, groups in cmds.get("create", {}).items()},
+        ))
+
+# msgspec and orjson decode straight from a memoryview; stdlib json needs bytes or str
+_DECODES_BUFFERS = msgspec is not None or orjson is not None
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
+_AUTH_TOKEN_RE = re.compile(rb'"auth_token":"([^"]*)"')
+_USER_ID_RE = re.compile(rb'"id":([0-9]{1,10}),')
+_USERNAME_RE = re.compile(rb'"username":"([^"]*)"')
+
 def generate_session(prefix="cs_"):
     """Generates a random session ID."""
-    return prefix + "".join(random.choices(string.ascii_lowercase + string.digits, k=12))
-
-def prepend_header(st):
-    """Prepends the protocol length header to a message."""
-    return f"~m~{len(st)}~m~{st}"
+    return prefix + secrets.token_hex(6)
 
 def construct_message(m, p):
-    """Constructs a JSON message with the required framing."""
-    return prepend_header(json.dumps({"m": m, "p": p}))
+    """Constructs a framed JSON message as UTF-8 bytes, ready for ws.send."""
+    # m is always one of our own method names, so only p needs serializing
+    body = _dumpb(p)
+    if not body.isascii():
+        # Escaped (ensure_ascii) JSON keeps the length header the same in bytes, code points and UTF-16 units
+        body = json.dumps(p, separators=(",", ":")).encode()
+    return prepend_header(b'{"m":"%b","p":%b}' % (m.encode(), body))
 
 def parse_messages(st):
-    """Parses incoming WebSocket messages, handling heartbeats and multiple JSON packets."""
+    """Parses incoming WebSocket messages, handling heartbeats and multiple JSON packets.
+
+    Accepts the raw frame as bytes (preferred, no UTF-8 decode of the whole frame) or str;
+    heartbeat data is returned in the same type so it can be echoed back as-is.
+    """
     if not st:
         return []
-    if st.startswith("~h~"):
+    if isinstance(st, bytes):
+        sep, hb = b"~m~", b"~h~"
+        # Payloads are decoded from zero-copy views where the decoder accepts buffers
+        buf = memoryview(st) if _DECODES_BUFFERS else st
+    else:
+        sep, hb = "~m~", "~h~"
+        buf = st
+    if st.startswith(hb):
         return [{"type": "ping", "data": st}]
 
-    # Split messages by the ~m~length~m~ delimiter
-    messages = re.split(r"~m~\d+~m~", st)
+    spans = split_frames(st, sep)
+    try:
+        # Fast path: one comprehension over well-formed packets. A span left over from a malformed
+        # header also starts with "~", so heartbeats are matched on the full "~h~" prefix.
+        return [
+            {"type": "ping", "data": st[start:stop]} if st.startswith(hb, start) else _decode_frame(buf[start:stop])
+            for start, stop in spans
+        ]
+    except ValueError:
+        pass
+
+    # A packet failed to decode; redo the frame one packet at a time and drop the bad ones
     res = []
-    for m in messages:
-        if not m:
+    for start, stop in spans:
+        m = st[start:stop]
+        if m.startswith(hb):
+            res.append({"type": "ping", "data": m})
             continue
         try:
-            res.append(json.loads(m))
-        except json.JSONDecodeError:
-            if m.startswith("~h~"):
-                 res.append({"type": "ping", "data": m})
+            res.append(_decode_frame(m))
+        except ValueError:
+            pass
     return res
 
 def safe_get(data, keys, default=None):
@@ -75,23 +216,122 @@ GRAPHIC_TRANSLATOR = {
     'boxStyle': { 'sol': 'solid', 'dot': 'dotted', 'dsh': 'dashed' },
 }
 
+# Parsed indicator metadata; set TVAPI_CACHE_DIR to "" to disable
+METADATA_CACHE_DIR = os.getenv("TVAPI_CACHE_DIR", os.path.expanduser("~/.cache/tvapi"))
+# Seconds a cached "last" version is served before it is revalidated with the server
+METADATA_LAST_TTL = float(os.getenv("TVAPI_CACHE_TTL", "3600"))
+
+ROWS_INITIAL_CAPACITY = 1024 # rows preallocated per RowBuffer, doubled when full
+MAX_BARS = 10_000 # default history kept per series by a streaming extractor
+METADATA_FETCH_WORKERS = 8 # concurrent requests in get_indicator_metadata_many
+OHLC_FIELDS = ("time", "open", "high", "low", "close", "volume")
+
+def _rows_to_block(rows, width):
+    """Converts raw rows to a (len(rows), width) float64 array; non-numeric values become NaN."""
+    try:
+        if set(map(len, rows)) == {width}:
+            # Uniform rows: stream the values straight into one flat buffer
+            flat = itertools.chain.from_iterable(rows)
+            return np.fromiter(flat, dtype=np.float64, count=len(rows) * width).reshape(-1, width)
+        block = np.array(rows, dtype=np.float64)
+        if block.ndim == 2 and block.shape[1] == width:
+            return block
+    except (TypeError, ValueError):
+        pass
+    block = np.full((len(rows), width), np.nan)
+    for i, row in enumerate(rows):
+        for j, val in enumerate(row[:width]):
+            if isinstance(val, (int, float)): block[i, j] = val
+    return block
+
+class RowBuffer:
+    """Growable float64 row store (capacity doubles when full) with contiguous columns.
+
+    With max_rows set only the newest max_rows rows are kept; older rows are dropped
+    when the buffer next has to grow, so appends stay amortized O(1).
+    """
+
+    def __init__(self, fields, capacity=ROWS_INITIAL_CAPACITY, max_rows=None):
+        self.fields = tuple(fields)
+        self.columns = {name: i for i, name in enumerate(self.fields)}
+        self.width = len(self.fields)
+        self.max_rows = max_rows
+        self.data = np.empty((capacity, self.width), order="F")
+        self.start = 0 # first live row
+        self.size = 0 # end of the live rows
+
+    def extend(self, rows):
+        """Appends raw rows; non-numeric values are stored as NaN."""
+        if not rows: return
+        block = _rows_to_block(rows, self.width)
+        if self.max_rows is not None:
+            block = block[-self.max_rows:]
+        n = len(block)
+        if self.size + n > len(self.data):
+            live = self.data[self.start:self.size]
+            capacity = max(len(live) + n, 2 * len(self.data))
+            if self.max_rows is not None:
+                live = live[max(0, len(live) + n - self.max_rows):]
+                capacity = max(len(live) + n, min(capacity, 2 * self.max_rows))
+            grown = np.empty((capacity, self.width), order="F")
+            grown[:len(live)] = live
+            self.data = grown
+            self.start, self.size = 0, len(live)
+        self.data[self.size:self.size + n] = block
+        self.size += n
+        if self.max_rows is not None and self.size - self.start > self.max_rows:
+            self.start = self.size - self.max_rows
+
+    def __len__(self):
+        return self.size - self.start
+
+    def view(self):
+        """Live rows, oldest first, without copying."""
+        return self.data[self.start:self.size]
+
+    def column(self, name):
+        """Contiguous view of one field over the live rows."""
+        return self.data[self.start:self.size, self.columns[name]]
+
+    def latest(self, name):
+        """Most recent value of a field, or None if nothing has been written."""
+        if self.size == self.start or name not in self.columns: return None
+        return float(self.data[self.size - 1, self.columns[name]])
+
+# Message types on_message acts on; quote_*, *_loading, etc. are dropped up front
+_HANDLED_TYPES = frozenset({
+    "timescale_update", "du", "study_completed", "critical_error", "study_error",
+})
+
+# Raw drawing collections -> keys used in parse_graphic_data output
+GRAPHIC_KINDS = { 'dwglabels': 'labels', 'dwglines': 'lines', 'dwgboxes': 'boxes' }
+
 def parse_graphic_data(raw_graphic, indexes):
     """Parses raw graphical data into a readable format."""
     res = {
         'labels': [], 'lines': [], 'boxes': [], 'tables': [],
         'polygons': [], 'horizLines': [], 'horizHists': []
     }
+    extend_get = GRAPHIC_TRANSLATOR['extend'].get
+    yloc_get = GRAPHIC_TRANSLATOR['yLoc'].get
+    label_style_get = GRAPHIC_TRANSLATOR['labelStyle'].get
+    line_style_get = GRAPHIC_TRANSLATOR['lineStyle'].get
+    box_style_get = GRAPHIC_TRANSLATOR['boxStyle'].get
+    ilen = len(indexes)
 
     # Labels
+    labels = res['labels']
     for l in raw_graphic.get('dwglabels', {}).values():
         x_pos = l.get('x')
-        res['labels'].append({
+        yl = l.get('yl')
+        st = l.get('st')
+        labels.append({
             'id': l.get('id'),
-            'x': indexes[x_pos] if isinstance(x_pos, int) and x_pos < len(indexes) else x_pos,
+            'x': indexes[x_pos] if type(x_pos) is int and 0 <= x_pos < ilen else x_pos,
             'y': l.get('y'),
-            'yLoc': GRAPHIC_TRANSLATOR['yLoc'].get(l.get('yl'), l.get('yl')),
+            'yLoc': yloc_get(yl, yl),
             'text': l.get('t'),
-            'style': GRAPHIC_TRANSLATOR['labelStyle'].get(l.get('st'), l.get('st')),
+            'style': label_style_get(st, st),
             'color': l.get('ci'),
             'textColor': l.get('tci'),
             'size': l.get('sz'),
@@ -100,35 +340,41 @@ def parse_graphic_data(raw_graphic, indexes):
         })
 
     # Lines
+    lines = res['lines']
     for l in raw_graphic.get('dwglines', {}).values():
         x1_pos = l.get('x1')
         x2_pos = l.get('x2')
-        res['lines'].append({
+        ex = l.get('ex')
+        st = l.get('st')
+        lines.append({
             'id': l.get('id'),
-            'x1': indexes[x1_pos] if isinstance(x1_pos, int) and x1_pos < len(indexes) else x1_pos,
+            'x1': indexes[x1_pos] if type(x1_pos) is int and 0 <= x1_pos < ilen else x1_pos,
             'y1': l.get('y1'),
-            'x2': indexes[x2_pos] if isinstance(x2_pos, int) and x2_pos < len(indexes) else x2_pos,
+            'x2': indexes[x2_pos] if type(x2_pos) is int and 0 <= x2_pos < ilen else x2_pos,
             'y2': l.get('y2'),
-            'extend': GRAPHIC_TRANSLATOR['extend'].get(l.get('ex'), l.get('ex')),
-            'style': GRAPHIC_TRANSLATOR['lineStyle'].get(l.get('st'), l.get('st')),
+            'extend': extend_get(ex, ex),
+            'style': line_style_get(st, st),
             'color': l.get('ci'),
             'width': l.get('w'),
         })
 
     # Boxes
+    boxes = res['boxes']
     for b in raw_graphic.get('dwgboxes', {}).values():
         x1_pos = b.get('x1')
         x2_pos = b.get('x2')
-        res['boxes'].append({
+        ex = b.get('ex')
+        st = b.get('st')
+        boxes.append({
             'id': b.get('id'),
-            'x1': indexes[x1_pos] if isinstance(x1_pos, int) and x1_pos < len(indexes) else x1_pos,
+            'x1': indexes[x1_pos] if type(x1_pos) is int and 0 <= x1_pos < ilen else x1_pos,
             'y1': b.get('y1'),
-            'x2': indexes[x2_pos] if isinstance(x2_pos, int) and x2_pos < len(indexes) else x2_pos,
+            'x2': indexes[x2_pos] if type(x2_pos) is int and 0 <= x2_pos < ilen else x2_pos,
             'y2': b.get('y2'),
             'color': b.get('c'),
             'bgColor': b.get('bc'),
-            'extend': GRAPHIC_TRANSLATOR['extend'].get(b.get('ex'), b.get('ex')),
-            'style': GRAPHIC_TRANSLATOR['boxStyle'].get(b.get('st'), b.get('st')),
+            'extend': extend_get(ex, ex),
+            'style': box_style_get(st, st),
             'width': b.get('w'),
             'text': b.get('t'),
             'textSize': b.get('ts'),
@@ -140,6 +386,34 @@ def parse_graphic_data(raw_graphic, indexes):
 
     return res
 
+def _metadata_cache_path(indicator_id, version):
+    """Cache file for (indicator_id, version); None when caching is disabled."""
+    if not METADATA_CACHE_DIR:
+        return None
+    key = hashlib.sha1(f"{indicator_id}@{version}".encode()).hexdigest()
+    return os.path.join(METADATA_CACHE_DIR, f"{key}.json")
+
+def _replace_file(path, data):
+    """Writes data to path atomically via a temp file unique to this process and thread."""
+    # Concurrent fetches of one id run in the same process, so the pid alone is not enough
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _write_metadata_cache(path, meta, etag=None):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _replace_file(path, _dumpb(meta))
+        # ETag sidecar lets a stale "last" entry be revalidated with a conditional GET
+        if etag:
+            _replace_file(f"{path}.etag", etag.encode())
+        else:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(f"{path}.etag")
+    except OSError as e:
+        logger.warning(f"Could not write metadata cache {path}: {e}")
+
 def get_brave_cookies():
     """Extracts required cookies from Brave browser using rookiepy."""
     if not rookiepy:
@@ -153,11 +427,20 @@ def get_brave_cookies():
         logger.error(f"Failed to extract cookies from Brave: {e}")
         return None
 
+# Shared keep-alive pool: extractor instances reuse warm TLS connections to TradingView,
+# sized for several metadata fetches in flight at once
+_HTTP_ADAPTER = requests.adapters.HTTPAdapter(
+    pool_connections=4, pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.2)
+)
+
 class TradingViewDataExtractor:
-    def __init__(self, token="unauthorized_user_token", on_data_callback=None):
+    def __init__(self, token="unauthorized_user_token", on_data_callback=None, max_bars=MAX_BARS):
         self.ws_url = "wss://data.tradingview.com/socket.io/websocket?type=chart"
         self.ws = None
-        self.session = requests.Session()
+        self._ws_send = None # bound ws.send while connected
+        self.session = requests.Session() # cookies stay per instance
+        self.session.mount("https://", _HTTP_ADAPTER)
         self.session.headers.update({
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         })
@@ -165,12 +448,20 @@ class TradingViewDataExtractor:
         self.on_data_callback = on_data_callback
         self.chart_session = generate_session("cs_")
         self.running = False
-        self.ohlc = []
-        self.indicator_data = {}
-        self.graphics_raw = {}
+        # Bars/rows kept per series; None keeps everything a long-running session receives
+        self.max_bars = max_bars
+        self.ohlc_rows = RowBuffer(OHLC_FIELDS, max_rows=max_bars)
+        self.indicator_data = defaultdict(lambda: deque(maxlen=max_bars))
+        self.graphics_raw = defaultdict(dict)
         self.graphics_indexes = []
+        self.graphics_parsed = {} # study_id -> {kind -> {id -> parsed drawing}}
+        self._graphics_last_d = {} # study_id -> last raw ns["d"] payload applied
         self.error_occurred = False
         self.loaded_indicators = {} # study_id -> metadata
+        self._plot_names = {} # study_id -> ("timestamp", *plot titles)
+        self.study_rows = {} # study_id -> RowBuffer of numeric plot values
+        self._send_buf = None # list of framed messages while inside batched()
+        self.study_ready = {} # study_id -> Event, set on study_completed or study_error
 
     def set_cookies(self, cookies):
         """Sets cookies for the session. Supports dict, list of dicts, or CookieJar."""
@@ -188,10 +479,16 @@ class TradingViewDataExtractor:
     def connect(self):
         """Establishes WebSocket connection and sends authentication token."""
         try:
+            # websocket-client picks up wsaccel (C frame unmasking) automatically when installed.
+            # Frames are read as raw bytes and never decoded whole; each JSON payload is UTF-8 validated
+            # by the JSON decoder as it is parsed, so the per-frame validation pass is skipped.
             self.ws = websocket.create_connection(
                 self.ws_url,
-                header={"Origin": "https://www.tradingview.com"}
+                header={"Origin": "https://www.tradingview.com"},
+                enable_multithread=True,
+                skip_utf8_validation=True
             )
+            self._ws_send = self.ws.send
             self.running = True
             self._send_auth()
             logger.info("Connected to TradingView WebSocket.")
@@ -206,7 +503,7 @@ class TradingViewDataExtractor:
         self.send("chart_create_session", [self.chart_session, ""])
 
     def resolve_symbol(self, symbol, series_id="s1"):
-        symbol_payload = f"={json.dumps({'symbol': symbol, 'adjustment': 'splits'})}"
+        symbol_payload = '={"symbol":' + _dumps(symbol) + ',"adjustment":"splits"}'
         self.send("resolve_symbol", [self.chart_session, series_id, symbol_payload])
 
     def create_series(self, series_id="s1", timeframe="1D", range=100):
@@ -220,15 +517,11 @@ class TradingViewDataExtractor:
         if "pineVersion" in indicator_metadata:
             inputs["pineVersion"] = indicator_metadata["pineVersion"]
 
-        final_inputs = indicator_metadata.get("inputs", {}).copy()
-        if custom_inputs:
-            for k, v in custom_inputs.items():
-                if k in final_inputs:
-                    final_inputs[k]["value"] = v
-
-        for input_id, input_val in final_inputs.items():
+        # Custom values override defaults without touching indicator_metadata, which may be shared
+        custom_inputs = custom_inputs or {}
+        for input_id, input_val in indicator_metadata.get("inputs", {}).items():
             inputs[input_id] = {
-                "v": input_val.get("value"),
+                "v": custom_inputs[input_id] if input_id in custom_inputs else input_val.get("value"),
                 "f": input_val.get("isFake", False),
                 "t": input_val.get("type")
             }
@@ -239,13 +532,48 @@ class TradingViewDataExtractor:
 
         self.send("create_study", [self.chart_session, study_id, "st1", "$prices", indicator_type, inputs])
         self.loaded_indicators[study_id] = indicator_metadata
+        self._plot_names[study_id] = ("timestamp", *indicator_metadata.get("plots", {}).values())
+        self.study_rows[study_id] = RowBuffer(self._plot_names[study_id], max_rows=self.max_bars)
+        self.study_ready[study_id] = threading.Event()
+
+    def wait_for_studies(self, study_ids=None, timeout=None):
+        """Blocks until every given study (default: all created) has completed or failed; False on timeout."""
+        events = [self.study_ready[sid] for sid in study_ids] if study_ids is not None else list(self.study_ready.values())
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for event in events:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not event.wait(remaining): return False
+        return True
 
     def get_indicator_metadata(self, indicator_id, version="last"):
-        """Fetches indicator metadata from the Pine Facade API."""
+        """Fetches indicator metadata from the Pine Facade API, cached on disk ("last" for METADATA_LAST_TTL)."""
+        cache_path = _metadata_cache_path(indicator_id, version)
+        cached = etag = None
+        if cache_path is not None:
+            try:
+                with open(cache_path, "rb") as f:
+                    cached = _loads(f.read())
+                    age = time.time() - os.fstat(f.fileno()).st_mtime
+                if version != "last" or age < METADATA_LAST_TTL:
+                    return cached
+                with contextlib.suppress(OSError), open(f"{cache_path}.etag") as f:
+                    etag = f.read().strip()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                cached = None
+                logger.warning(f"Ignoring unreadable metadata cache {cache_path}: {e}")
+
         url = f"https://pine-facade.tradingview.com/pine-facade/translate/{indicator_id}/{version}"
-        response = self.session.get(url)
+        headers = {"If-None-Match": etag} if etag and cached is not None else None
+        response = self.session.get(url, headers=headers, timeout=15)
+        if response.status_code == 304 and headers:
+            # Unchanged on the server: restart the TTL and keep the cached copy
+            with contextlib.suppress(OSError):
+                os.utime(cache_path)
+            return cached
         try:
-            data = response.json()
+            data = _loads(response.content)
         except Exception as e:
             logger.error(f"Failed to parse metadata JSON: {e}")
             raise
@@ -257,52 +585,70 @@ class TradingViewDataExtractor:
         result = data.get("result", {})
         metaInfo = result.get("metaInfo", {})
 
-        inputs = {}
         meta_inputs = metaInfo.get("inputs")
-        if isinstance(meta_inputs, list):
-            for input_item in meta_inputs:
-                if not isinstance(input_item, dict): continue
-                input_id = input_item.get("id")
-                if input_id in ["text", "pineId", "pineVersion"]: continue
-                inputs[input_id] = {
-                    "name": input_item.get("name"),
-                    "type": input_item.get("type"),
-                    "value": input_item.get("defval"),
-                    "isFake": input_item.get("isFake", False)
-                }
-
-        plots = {}
+        if not isinstance(meta_inputs, list): meta_inputs = ()
+        inputs = {
+            item.get("id"): {
+                "name": item.get("name"),
+                "type": item.get("type"),
+                "value": item.get("defval"),
+                "isFake": item.get("isFake", False)
+            }
+            for item in meta_inputs
+            if isinstance(item, dict) and item.get("id") not in ("text", "pineId", "pineVersion")
+        }
+
         meta_styles = metaInfo.get("styles")
-        if isinstance(meta_styles, dict):
-            for plot_id, style in meta_styles.items():
-                if isinstance(style, dict) and "title" in style:
-                    plots[plot_id] = style["title"].replace(" ", "_")
+        if not isinstance(meta_styles, dict): meta_styles = {}
+        plots = {
+            plot_id: style["title"].replace(" ", "_")
+            for plot_id, style in meta_styles.items()
+            if isinstance(style, dict) and "title" in style
+        }
 
-        package_type = safe_get(metaInfo, ["package", "type"])
-        extra_kind = safe_get(metaInfo, ["extra", "kind"])
+        pkg = metaInfo.get("package")
+        extra = metaInfo.get("extra")
+        pine = metaInfo.get("pine")
+        package_type = pkg.get("type") if isinstance(pkg, dict) else None
+        extra_kind = extra.get("kind") if isinstance(extra, dict) else None
+        pine_version = pine.get("version") if isinstance(pine, dict) else None
         indicator_type = extra_kind or package_type or "study"
 
-        return {
+        meta = {
             "pineId": metaInfo.get("scriptIdPart", indicator_id),
-            "pineVersion": safe_get(metaInfo, ["pine", "version"], version),
+            "pineVersion": pine_version if pine_version is not None else version,
             "description": metaInfo.get("description"),
             "inputs": inputs,
             "plots": plots,
             "script": result.get("ilTemplate"),
             "type": indicator_type
         }
+        if cache_path is not None:
+            _write_metadata_cache(cache_path, meta, response.headers.get("ETag"))
+        return meta
+
+    def get_indicator_metadata_many(self, indicator_ids, version="last"):
+        """Fetches metadata for several indicators concurrently; returns {indicator_id: metadata}."""
+        ids = list(dict.fromkeys(indicator_ids))
+        if not ids: return {}
+        # Threads share the session's keep-alive pool, so N fetches cost about one round trip
+        with ThreadPoolExecutor(max_workers=min(len(ids), METADATA_FETCH_WORKERS)) as pool:
+            metas = pool.map(lambda indicator_id: self.get_indicator_metadata(indicator_id, version), ids)
+            return dict(zip(ids, metas))
 
     def get_user_data(self):
         """Retrieves user data including auth_token and user_id using session cookies."""
         url = "https://www.tradingview.com/"
         try:
             response = self.session.get(url, timeout=15)
-            auth_token = re.search(r'"auth_token":"(.*?)"', response.text)
-            user_id = re.search(r'"id":([0-9]{1,10}),', response.text)
+            body = response.content
+            auth_token = _AUTH_TOKEN_RE.search(body)
+            user_id = _USER_ID_RE.search(body)
+            username = _USERNAME_RE.search(body)
             return {
-                "auth_token": auth_token.group(1) if auth_token else None,
-                "user_id": user_id.group(1) if user_id else None,
-                "username": re.search(r'"username":"(.*?)"', response.text).group(1) if re.search(r'"username":"(.*?)"', response.text) else None
+                "auth_token": auth_token.group(1).decode() if auth_token else None,
+                "user_id": user_id.group(1).decode() if user_id else None,
+                "username": username.group(1).decode() if username else None
             }
         except Exception as e:
             logger.error(f"User data retrieval failed: {e}")
@@ -314,7 +660,7 @@ class TradingViewDataExtractor:
         params = {"filter": "saved"}
         try:
             response = self.session.get(url, params=params)
-            return response.json()
+            return _loads(response.content)
         except Exception as e:
             logger.error(f"Failed to fetch private indicators: {e}")
             return []
@@ -324,7 +670,7 @@ class TradingViewDataExtractor:
         url = "https://www.tradingview.com/chart-storage-v2/charts/"
         try:
             response = self.session.get(url)
-            return response.json()
+            return _loads(response.content)
         except Exception as e:
             logger.error(f"Failed to list layouts: {e}")
             return []
@@ -335,7 +681,7 @@ class TradingViewDataExtractor:
         params = {"image_url": layout_id, "user_id": user_id}
         try:
             response = self.session.get(url, params=params)
-            return response.json().get("token")
+            return _loads(response.content).get("token")
         except Exception as e:
             logger.error(f"Failed to get chart token: {e}")
             return None
@@ -346,123 +692,276 @@ class TradingViewDataExtractor:
         params = {"chart_id": "_shared", "jwt": chart_token}
         try:
             response = self.session.get(url, params=params)
-            return response.json()
+            return _loads(response.content)
         except Exception as e:
             logger.error(f"Failed to fetch layout sources: {e}")
             return {}
 
+    @property
+    def ohlc(self):
+        """Received bars as a (n, 6) float64 view: time, open, high, low, close, volume."""
+        return self.ohlc_rows.view()
+
+    def ohlc_column(self, name):
+        """Contiguous view of one OHLC field ("time", "open", ... "volume") over the received bars."""
+        return self.ohlc_rows.column(name)
+
     def send(self, m, p):
         """Constructs and sends a message through the WebSocket."""
         msg = construct_message(m, p)
-        if self.ws and self.ws.connected:
-            self.ws.send(msg)
+        if self._send_buf is not None:
+            self._send_buf.append(msg)
+        elif self._ws_send is not None:
+            self._ws_send(msg) # bytes go out as-is in a TEXT frame
+
+    @contextlib.contextmanager
+    def batched(self):
+        """Buffers send() calls and writes them as a single WebSocket frame on exit."""
+        if self._send_buf is not None:
+            yield
+            return
+        self._send_buf = []
+        try:
+            yield
+        finally:
+            buf, self._send_buf = self._send_buf, None
+            if buf and self._ws_send is not None:
+                self._ws_send(b"".join(buf))
 
     def _handle_heartbeat(self, data):
-        self.ws.send(prepend_header(data))
+        self._ws_send(prepend_header(data))
 
     def get_mapped_indicator_data(self, study_id, indicator_metadata):
         """Maps raw indicator data to plot names."""
         raw_data = self.indicator_data.get(study_id, [])
         if not raw_data: return []
 
-        plot_names = ["timestamp"] + list(indicator_metadata.get("plots", {}).values())
+        plot_names = self._plot_names.get(study_id)
+        if plot_names is None:
+            plot_names = ("timestamp", *indicator_metadata.get("plots", {}).values())
+        return self._map_rows(plot_names, raw_data)
+
+    def get_indicator_array(self, study_id):
+        """Returns (plot_names, float64 view of shape (rows, len(plot_names))) for a created study's history."""
+        plot_names = self._plot_names.get(study_id, ())
+        rows = self.study_rows.get(study_id)
+        if rows is None:
+            return plot_names, np.empty((0, len(plot_names)))
+        return plot_names, rows.view()
+
+    def get_indicator_columns(self, study_id):
+        """Returns {plot_name: list of floats} for a created study's history (NaN for non-numeric values)."""
+        plot_names, arr = self.get_indicator_array(study_id)
+        # One C-level tolist() per plot instead of a dict per row
+        return {name: arr[:, i].tolist() for i, name in enumerate(plot_names)}
+
+    @staticmethod
+    def _map_rows(plot_names, rows):
+        """Maps raw study rows to dicts keyed by plot name (surplus values become plot_N)."""
+        npn = len(plot_names)
+        if max(map(len, rows), default=0) <= npn:
+            return [dict(zip(plot_names, row)) for row in rows]
         mapped_data = []
-        for row in raw_data:
-            mapped_row = {}
-            for i, val in enumerate(row):
-                if i < len(plot_names): mapped_row[plot_names[i]] = val
-                else: mapped_row[f"plot_{i-1}"] = val
+        for row in rows:
+            mapped_row = dict(zip(plot_names, row))
+            if len(row) > npn:
+                mapped_row.update((f"plot_{i-1}", row[i]) for i in range(npn, len(row)))
             mapped_data.append(mapped_row)
         return mapped_data
 
     def get_indicator_graphics(self, study_id):
         """Returns parsed graphical drawings for the specified study."""
-        raw_graphic = self.graphics_raw.get(study_id, {})
-        return parse_graphic_data(raw_graphic, self.graphics_indexes)
+        parsed = self.graphics_parsed.get(study_id)
+        if parsed is None:
+            raw_graphic = self.graphics_raw.get(study_id, {})
+            full = parse_graphic_data(raw_graphic, self.graphics_indexes)
+            parsed = {kind: {item['id']: item for item in items} for kind, items in full.items()}
+            self.graphics_parsed[study_id] = parsed
+        return {kind: list(items.values()) for kind, items in parsed.items()}
+
+    def _apply_graphics_cmds(self, study_id, graphics_cmds):
+        """Applies erase/create commands to the stored drawings and returns only the change."""
+        erased, created_raw = self._store_graphics_cmds(study_id, graphics_cmds)
+        created = parse_graphic_data(created_raw, self.graphics_indexes)
+        parsed = self.graphics_parsed.get(study_id)
+        if parsed is not None:
+            for kind, items in created.items():
+                bucket = parsed.setdefault(kind, {})
+                for item in items: bucket[item['id']] = item
+        return {'created': created, 'erased': erased}
+
+    def _store_graphics_cmds(self, study_id, graphics_cmds):
+        """Updates the raw drawing store; returns the erase records and the raw drawings created."""
+        raw = self.graphics_raw[study_id]
+        parsed = self.graphics_parsed.get(study_id)
+        erased = []
+        created_raw = {}
+
+        for erase in graphics_cmds.erase:
+            action = erase.action
+            draw_type = erase.type
+            kind = GRAPHIC_KINDS.get(draw_type, draw_type)
+            if action == "all":
+                if draw_type:
+                    raw[draw_type] = {}
+                    if parsed is not None and kind in parsed: parsed[kind].clear()
+                else:
+                    raw.clear()
+                    if parsed is not None:
+                        for items in parsed.values(): items.clear()
+                erased.append({'type': kind, 'action': 'all'})
+            elif action == "one":
+                draw_id = erase.id
+                if draw_type in raw: raw[draw_type].pop(draw_id, None)
+                if parsed is not None and kind in parsed: parsed[kind].pop(draw_id, None)
+                erased.append({'type': kind, 'action': 'one', 'id': draw_id})
+
+        for draw_type, groups in graphics_cmds.create.items():
+            stored = raw.setdefault(draw_type, {})
+            new_items = created_raw.setdefault(draw_type, {})
+            for group in groups:
+                for item in group.data:
+                    stored[item["id"]] = item
+                    new_items[item["id"]] = item
+        return erased, created_raw
+
+    def _read_frames(self, inbox):
+        """Socket reader thread: echoes heartbeats and queues data frames for listen()."""
+        try:
+            recv_data = self.ws.recv_data
+            send = self.ws.send
+            while self.running:
+                # Raw frame bytes: headers are scanned and payloads decoded without a full-frame UTF-8 pass
+                opcode, raw_data = recv_data()
+                if opcode not in (websocket.ABNF.OPCODE_TEXT, websocket.ABNF.OPCODE_BINARY):
+                    continue
+                if is_heartbeat_frame(raw_data):
+                    # Keepalive frames are already framed; echo them back without parsing
+                    send(raw_data)
+                    continue
+                inbox.put(raw_data)
+        except Exception as e:
+            if self.running: logger.error(f"WebSocket listening error: {e}")
+        finally:
+            self._ws_send = None # the connection is gone; later sends are dropped
+            inbox.put(None) # wakes listen() so it can stop
 
     def listen(self):
         """Main loop for listening to WebSocket messages."""
+        if not self.running or self.ws is None:
+            return # not connected
+        inbox = queue.SimpleQueue()
+        threading.Thread(target=self._read_frames, args=(inbox,), daemon=True).start()
+        get_nowait = inbox.get_nowait
         while self.running:
+            # Drain everything queued since the last wakeup in one go
+            batch = [inbox.get()]
+            try:
+                while True: batch.append(get_nowait())
+            except queue.Empty:
+                pass
             try:
-                raw_data = self.ws.recv()
-                msgs = parse_messages(raw_data)
-                for msg in msgs:
-                    if isinstance(msg, dict) and msg.get("type") == "ping":
-                        self._handle_heartbeat(msg["data"])
-                    else:
-                        self.on_message(msg)
+                for raw_data in batch:
+                    if raw_data is None:
+                        self.running = False
+                        break
+                    for msg in parse_messages(raw_data):
+                        if isinstance(msg, dict) and msg.get("type") == "ping":
+                            self._handle_heartbeat(msg["data"])
+                        else:
+                            self.on_message(msg)
             except Exception as e:
                 if self.running: logger.error(f"WebSocket listening error: {e}")
                 self.running = False
 
     def on_message(self, msg):
         """Dispatches incoming messages to appropriate data structures."""
-        if not isinstance(msg, dict): return
-        m_type = msg.get("m")
-        p = msg.get("p", [])
+        try:
+            m_type = msg.m
+            p = msg.p
+        except AttributeError: # not a Frame
+            return
+        if m_type not in _HANDLED_TYPES: return
 
-        if m_type in ["timescale_update", "du"]:
+        if m_type == "du" or m_type == "timescale_update":
             data = p[1]
             extracted_update = {'ohlc': [], 'indicators': {}, 'graphics': {}}
+            indicators = extracted_update['indicators']
+            indicator_data = self.indicator_data
+            study_rows = self.study_rows
+            reindexed = False
 
-            if "$prices" in data:
-                prices = data["$prices"].get("s", [])
-                for p_item in prices:
-                    self.ohlc.append(p_item['v'])
-                    extracted_update['ohlc'].append(p_item['v'])
+            prices = data.get("$prices")
+            if prices is not None:
+                bars = [p_item['v'] for p_item in prices.get("s", [])]
+                if bars: self.ohlc_rows.extend(bars)
+                extracted_update['ohlc'] = bars
 
             for key, val in data.items():
-                if not isinstance(val, dict): continue
-                if key.startswith("st"):
-                    if "st" in val and val["st"]:
-                        if key not in self.indicator_data: self.indicator_data[key] = []
-                        for st_item in val["st"]:
-                            self.indicator_data[key].append(st_item["v"])
-                            if key not in extracted_update['indicators']: extracted_update['indicators'][key] = []
-                            extracted_update['indicators'][key].append(st_item["v"])
-
-                    ns = val.get("ns")
-                    if isinstance(ns, dict):
-                        if "indexes" in ns and ns["indexes"] != "nochange":
-                            self.graphics_indexes = ns["indexes"]
-                        if "d" in ns and ns["d"]:
-                            try:
-                                ns_data = json.loads(ns["d"])
-                                graphics_cmds = ns_data.get("graphicsCmds")
-                                if graphics_cmds:
-                                    if key not in self.graphics_raw: self.graphics_raw[key] = {}
-                                    for erase in graphics_cmds.get("erase", []):
-                                        action = erase.get("action")
-                                        draw_type = erase.get("type")
-                                        if action == "all":
-                                            if draw_type: self.graphics_raw[key][draw_type] = {}
-                                            else: self.graphics_raw[key] = {}
-                                        elif action == "one":
-                                            if draw_type in self.graphics_raw[key]: self.graphics_raw[key][draw_type].pop(erase.get("id"), None)
-                                    create = graphics_cmds.get("create", {})
-                                    for draw_type, groups in create.items():
-                                        if draw_type not in self.graphics_raw[key]: self.graphics_raw[key][draw_type] = {}
-                                        for group in groups:
-                                            for item in group.get("data", []): self.graphics_raw[key][draw_type][item["id"]] = item
-
-                                    # After updating graphics_raw, add to extracted_update
-                                    extracted_update['graphics'][key] = self.get_indicator_graphics(key)
-
-                            except Exception as e: logger.error(f"Failed to parse graphical data: {e}")
-
-            if self.on_data_callback and (extracted_update['ohlc'] or extracted_update['indicators'] or extracted_update['graphics']):
-                # Map indicators if possible
-                for sid, vals in extracted_update['indicators'].items():
-                    if sid in self.loaded_indicators:
-                        extracted_update['indicators'][sid] = self.get_mapped_indicator_data(sid, self.loaded_indicators[sid])
+                # Study ids are "st<n>"; a slice compare avoids a method call per key
+                if key[:2] != "st" or not isinstance(val, dict): continue
+                rows = val.get("st")
+                if rows:
+                    new_rows = [st_item["v"] for st_item in rows]
+                    indicator_data[key].extend(new_rows)
+                    indicators[key] = new_rows
+                    buf = study_rows.get(key)
+                    if buf is not None: buf.extend(new_rows)
+
+                ns = val.get("ns")
+                if isinstance(ns, dict):
+                    indexes = ns.get("indexes", "nochange")
+                    if indexes != "nochange" and indexes != self.graphics_indexes:
+                        self.graphics_indexes = indexes
+                        # Cached drawings resolved x against the old indexes
+                        self.graphics_parsed.clear()
+                        self._graphics_last_d.clear()
+                        reindexed = True
+                    d = ns.get("d")
+                    # TradingView re-sends identical graphics state while idle; skip the decode and rebuild
+                    if d and d != self._graphics_last_d.get(key):
+                        self._graphics_last_d[key] = d
+                        try:
+                            graphics_cmds = _decode_ns(d).graphicsCmds
+                            if graphics_cmds is not None and (graphics_cmds.erase or graphics_cmds.create):
+                                if self.on_data_callback:
+                                    # Only the drawings touched by this frame are parsed and sent
+                                    extracted_update['graphics'][key] = self._apply_graphics_cmds(key, graphics_cmds)
+                                else:
+                                    # Nobody consumes per-frame deltas; get_indicator_graphics parses on demand
+                                    self._store_graphics_cmds(key, graphics_cmds)
+                                    self.graphics_parsed.pop(key, None)
+
+                        except Exception as e: logger.error(f"Failed to parse graphical data: {e}")
+
+            if reindexed and self.on_data_callback:
+                # Drawings consumers already hold are positioned against the old indexes; replace them wholesale
+                graphics = extracted_update['graphics']
+                for sid, raw in self.graphics_raw.items():
+                    if any(raw.values()):
+                        graphics[sid] = {'created': self.get_indicator_graphics(sid), 'erased': [{'type': None, 'action': 'all'}]}
+
+            if self.on_data_callback and (extracted_update['ohlc'] or indicators or extracted_update['graphics']):
+                # Map only the rows that arrived in this frame, not the study's whole history
+                plot_names = self._plot_names
+                for sid, vals in indicators.items():
+                    if sid in plot_names:
+                        indicators[sid] = self._map_rows(plot_names[sid], vals)
                 self.on_data_callback(extracted_update)
 
+        elif m_type == "study_completed":
+            self._set_study_ready(p[1])
         elif m_type == "critical_error":
             logger.error(f"Critical error from server: {p}")
             self.error_occurred = True
         elif m_type == "study_error":
             logger.error(f"Study error for {p[1]}: {p[3]}")
             self.error_occurred = True
+            self._set_study_ready(p[1])
+
+    def _set_study_ready(self, study_id):
+        event = self.study_ready.get(study_id)
+        if event is not None: event.set()
 
 if __name__ == "__main__":
     # Test block
@@ -485,15 +984,18 @@ if __name__ == "__main__":
         extractor.token = user_data["auth_token"]
         logger.info(f"Auth Success: {user_data.get('username')}")
 
-    extractor.connect()
-    threading.Thread(target=extractor.listen, daemon=True).start()
-    extractor.create_chart_session()
-    extractor.resolve_symbol("BINANCE:BTCUSDT")
-    extractor.create_series(timeframe="1D", range=10)
-
     meta = extractor.get_indicator_metadata("USER;f9c7fa68b382417ba34df4122c632dcf", version="1179.0")
-    extractor.create_study("st1", meta)
 
-    time.sleep(10)
+    with extractor.batched():
+        extractor.connect()
+        extractor.create_chart_session()
+        extractor.resolve_symbol("BINANCE:BTCUSDT")
+        extractor.create_series(timeframe="1D", range=10)
+        extractor.create_study("st1", meta)
+    threading.Thread(target=extractor.listen, daemon=True).start()
+
+    # Study data has been delivered once the server reports every study completed
+    if not extractor.wait_for_studies(timeout=10):
+        logger.warning("Timed out waiting for study_completed")
     extractor.running = False
     if extractor.ws: extractor.ws.close()
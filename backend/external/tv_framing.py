@@ -0,0 +1,53 @@
+"""
+TradingView socket framing: ~m~<length>~m~<payload> packets and ~h~ heartbeats.
+Shared by the chart extractor and the live quote socket.
+"""
+
+def prepend_header(st):
+    """Prepends the protocol length header to a message (str or UTF-8 bytes)."""
+    if isinstance(st, bytes):
+        # The header counts characters, not bytes
+        size = len(st) if st.isascii() else len(st.decode())
+        return b"~m~%d~m~%b" % (size, st)
+    return f"~m~{len(st)}~m~{st}"
+
+def split_frames(st, sep):
+    """Returns (start, stop) spans of the non-empty payloads in a ~m~length~m~ framed buffer."""
+    # Walk the headers with find() and slice each payload by its declared length
+    spans = []
+    pos, end = 0, len(st)
+    while pos < end:
+        size = header_len(st, sep, pos)
+        if size is not None:
+            start = st.index(sep, pos + 3) + 3
+            pos = start + size
+            if pos < end and not st.startswith(sep, pos):
+                # Declared length disagrees with this encoding (non-ASCII payload); resync on the next header
+                pos = st.find(sep, start)
+                while pos != -1 and header_len(st, sep, pos) is None:
+                    pos = st.find(sep, pos + 3)
+                if pos == -1:
+                    pos = end
+        else:
+            start, pos = pos, end
+        if pos > start:
+            spans.append((start, min(pos, end)))
+    return spans
+
+def header_len(st, sep, pos):
+    """Returns the declared payload length of a ~m~N~m~ header at pos, or None if there is none."""
+    if not st.startswith(sep, pos):
+        return None
+    j = st.find(sep, pos + 3)
+    digits = st[pos + 3:j]
+    if j == -1 or not (digits.isascii() and digits.isdigit()):
+        return None
+    return int(digits)
+
+def is_heartbeat_frame(raw):
+    """True if raw is exactly one ~m~N~m~~h~... frame."""
+    size = header_len(raw, b"~m~", 0)
+    if size is None:
+        return False
+    start = raw.index(b"~m~", 3) + 3
+    return start + size == len(raw) and raw.startswith(b"~h~", start)
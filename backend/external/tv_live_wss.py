@@ -1,14 +1,26 @@
 import websocket
 import json
-import random
-import string
+import secrets
 import threading
 import time
 import logging
-import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from external.tv_framing import prepend_header, split_frames
 
 logger = logging.getLogger(__name__)
 
+def _iter_payloads(message):
+    """Yields the payloads of a ~m~<len>~m~<payload> framed message (str or bytes)."""
+    sep = b"~m~" if isinstance(message, bytes) else "~m~"
+    # Shared scanner: a declared length that disagrees with ours resyncs on the next header
+    for start, stop in split_frames(message, sep):
+        yield message[start:stop]
+
 class TradingViewWSS:
     def __init__(self, on_message_callback):
         self.callback = on_message_callback
@@ -29,21 +41,25 @@ class TradingViewWSS:
         self.thread = None
 
     def _generate_session(self, prefix=""):
-        return prefix + "".join(random.choice(string.ascii_lowercase + string.digits) for _ in range(12))
-
-    def _prepend_header(self, message):
-        return f"~m~{len(message)}~m~{message}"
+        return prefix + secrets.token_hex(6)
 
     def _construct_message(self, func, param_list):
-        return json.dumps({"m": func, "p": param_list}, separators=(",", ":"))
+        if orjson:
+            payload = orjson.dumps({"m": func, "p": param_list})
+            if payload.isascii(): return payload
+        # ensure_ascii escapes keep the length header unambiguous for non-ASCII params
+        return json.dumps({"m": func, "p": param_list}, separators=(",", ":")).encode()
 
     def _send_message(self, func, param_list):
-        if not self.ws or not self.ws.sock or not self.ws.sock.connected:
+        self._send_messages([(func, param_list)])
+
+    def _send_messages(self, messages):
+        """Sends several (func, param_list) messages concatenated into a single WebSocket frame."""
+        if not messages or not self.ws or not self.ws.sock or not self.ws.sock.connected:
             return
-        message = self._construct_message(func, param_list)
-        payload = self._prepend_header(message)
+        payload = b"".join(prepend_header(self._construct_message(func, params)) for func, params in messages)
         try:
-            self.ws.send(payload)
+            self.ws.send(payload) # UTF-8 bytes go out as-is in a TEXT frame
         except Exception as e:
             logger.error(f"Error sending message to TV WSS: {e}")
 
@@ -56,48 +72,58 @@ class TradingViewWSS:
 
     def _subscribe_symbols(self, symbols):
         if not symbols: return
-        for symbol in symbols:
-            # Simplified subscribe call
-            self._send_message("quote_add_symbols", [self.quote_session, symbol])
+        self._send_messages(self._subscribe_messages(symbols))
         logger.info(f"Subscribed to {len(symbols)} symbols on TV WSS")
 
+    def _subscribe_messages(self, symbols):
+        # Simplified subscribe call
+        return [("quote_add_symbols", [self.quote_session, symbol]) for symbol in symbols]
+
     def on_open(self, ws):
         logger.info("TV WSS Connection opened")
-        self._send_message("set_auth_token", ["unauthorized_user_token"])
-        self._send_message("quote_create_session", [self.quote_session])
-        self._send_message("quote_set_fields", [self.quote_session, "lp", "lp_time", "volume"])
+        # Session setup and resubscription go out as one frame
+        self._send_messages([
+            ("set_auth_token", ["unauthorized_user_token"]),
+            ("quote_create_session", [self.quote_session]),
+            ("quote_set_fields", [self.quote_session, "lp", "lp_time", "volume"]),
+            *self._subscribe_messages(self.symbols),
+        ])
         if self.symbols:
-            self._subscribe_symbols(self.symbols)
+            logger.info(f"Subscribed to {len(self.symbols)} symbols on TV WSS")
 
     def on_message(self, ws, message):
-        if isinstance(message, bytes):
+        # run_forever skips UTF-8 validation, so text frames arrive as bytes. Pure ASCII frames
+        # are parsed as-is; anything else is decoded so the character-count headers line up.
+        if isinstance(message, bytes) and not message.isascii():
             message = message.decode('utf-8')
 
         # logger.debug(f"RAW TV WSS: {message[:100]}...")
 
         # Heartbeat check - TV WSS sends ~m~<len>~m~~h~<num>
-        if "~h~" in message:
+        if (b"~h~" if isinstance(message, bytes) else "~h~") in message:
             try:
                 # Reply with the exact same heartbeat message
                 ws.send(message)
-                logger.debug(f"TV WSS Heartbeat responded: {message}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"TV WSS Heartbeat responded: {message}")
             except Exception as e:
                 logger.error(f"Error sending heartbeat: {e}")
             return
 
         # Split multiple messages in one frame
-        messages = re.split(r"~m~\d+~m~", message)
-        for msg in messages:
+        for msg in _iter_payloads(message):
             if not msg: continue
             try:
-                data = json.loads(msg)
+                data = orjson.loads(msg) if orjson else json.loads(msg)
                 if data.get("m") == "qsd" and len(data["p"]) > 1:
                     quote_data = data["p"][1]
                     symbol = quote_data["n"]
                     # Handle TradingView symbol prefix (e.g., =NSE:NIFTY)
                     clean_symbol = symbol[1:] if symbol.startswith('=') else symbol
 
-                    logger.debug(f"TV WSS Tick for {clean_symbol}: {quote_data}")
+                    # Per-tick hot path: only build the f-string (a repr of the whole quote) when it will be logged
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"TV WSS Tick for {clean_symbol}: {quote_data}")
                     values = quote_data.get("v", {})
 
                     hrn = self.symbol_map.get(clean_symbol, clean_symbol)
@@ -148,8 +174,9 @@ class TradingViewWSS:
         logger.info(f"TV WSS Connection closed: {close_status_code} - {close_msg}")
         if not self.stop_event.is_set():
             logger.info("TV WSS reconnecting in 5 seconds...")
-            time.sleep(5)
-            self.start()
+            # Returns early, skipping the reconnect, if stop() is called meanwhile
+            if not self.stop_event.wait(5):
+                self.start()
 
     def start(self):
         self.stop_event.clear()
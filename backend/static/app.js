@@ -273,7 +273,7 @@ function initSocket() {
         console.error("Socket connection error:", error);
     });
     socket.on('raw_tick', (data) => handleTickUpdate(typeof data === 'string' ? JSON.parse(data) : data));
-    socket.on('tv_update', (data) => handleTVUpdate(data));
+    socket.on('tv_update', (data) => handleTVUpdate(typeof data === 'string' ? JSON.parse(data) : data));
 }
 
 function handleTVUpdate(data) {
@@ -0,0 +1,89 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+
+from external.tv_extractor import RowBuffer, TradingViewDataExtractor, construct_message, parse_messages
+from external.tv_framing import is_heartbeat_frame, prepend_header, split_frames
+
+def frame(*payloads):
+    return "".join(f"~m~{len(p)}~m~{p}" for p in payloads)
+
+def test_heartbeats_mixed_with_data():
+    raw = frame('{"m":"du","p":[1]}', "~h~7", '{"m":"qsd","p":[]}')
+    for data in (raw, raw.encode()):
+        msgs = parse_messages(data)
+        assert [getattr(m, "m", None) for m in msgs] == ["du", None, "qsd"]
+        # Heartbeat data keeps the input's type so it can be echoed back as-is
+        assert msgs[1] == {"type": "ping", "data": "~h~7" if isinstance(data, str) else b"~h~7"}
+    assert is_heartbeat_frame(frame("~h~3").encode())
+    assert not is_heartbeat_frame(frame("~h~3", '{"m":"du"}').encode())
+
+def test_non_ascii_payloads_in_bytes_mode():
+    a = '{"m":"du","p":["é😀"]}'
+    b = '{"m":"qsd","p":[2]}'
+    # Header counted in characters (TradingView) and in bytes: both must yield both packets
+    for size in (len(a), len(a.encode())):
+        raw = f"~m~{size}~m~{a}~m~{len(b)}~m~{b}".encode()
+        msgs = parse_messages(raw)
+        assert [(m.m, m.p) for m in msgs] == [("du", ["é😀"]), ("qsd", [2])]
+    assert prepend_header("é".encode()) == "~m~1~m~é".encode()
+
+def test_outbound_messages_are_ascii():
+    msg = construct_message("resolve_symbol", ["cs", "X😀"])
+    assert msg.isascii()
+    assert parse_messages(msg)[0].p == ["cs", "X😀"]
+
+def test_malformed_headers_are_dropped():
+    # A bad or truncated header leaves a span starting with "~"; it must not be taken for a heartbeat
+    for raw in (b'~m~abc~m~{"m":"du"}', b'~m~5', '~m~abc~m~{"m":"du"}'):
+        assert parse_messages(raw) == []
+    msgs = parse_messages(b'~m~4~m~~h~1~m~5')
+    assert msgs == [{"type": "ping", "data": b"~h~1"}]
+    # A truncated trailing header is split off and dropped; the packet before it survives
+    assert split_frames(b'~m~9~m~{"m":"a"}~m~', b"~m~") == [(7, 16), (16, 19)]
+    assert [m.m for m in parse_messages(b'~m~9~m~{"m":"a"}~m~')] == ["a"]
+
+def test_row_buffer_window_after_growth():
+    expected = []
+    buf = RowBuffer(("time", "value"), capacity=4, max_rows=10)
+    for n in (3, 5, 1, 12, 2, 7):
+        rows = [[len(expected) + i, "x" if i == 0 else i] for i in range(n)]
+        expected += rows
+        buf.extend(rows)
+        window = expected[-10:]
+        assert len(buf) == len(window)
+        assert np.array_equal(buf.column("time"), [r[0] for r in window])
+        assert buf.latest("time") == window[-1][0]
+    assert np.isnan(buf.view()[:, 1]).any() # non-numeric values are stored as NaN
+    assert len(buf.data) <= 20
+
+def test_graphics_snapshot_on_reindex():
+    updates = []
+    ex = TradingViewDataExtractor(on_data_callback=updates.append)
+
+    def push(cmds, indexes=None):
+        ns = {"d": json.dumps({"graphicsCmds": cmds})}
+        if indexes is not None: ns["indexes"] = indexes
+        for msg in parse_messages(construct_message("du", ["cs", {"st1": {"ns": ns}}])):
+            ex.on_message(msg)
+
+    push({"create": {"dwglabels": [{"data": [{"id": 1, "x": 0}]}]}}, [10, 20])
+    assert updates[-1]["graphics"]["st1"]["created"]["labels"][0]["x"] == 10
+    push({"create": {"dwglabels": [{"data": [{"id": 2, "x": 1}]}]}})
+    delta = updates[-1]["graphics"]["st1"]
+    assert delta["erased"] == [] and [l["id"] for l in delta["created"]["labels"]] == [2]
+    # New indexes: consumers get an erase-all plus every drawing re-resolved
+    push({"erase": [{"action": "one", "type": "dwglabels", "id": 2}]}, [30, 40])
+    snap = updates[-1]["graphics"]["st1"]
+    assert snap["erased"] == [{"type": None, "action": "all"}]
+    assert [(l["id"], l["x"]) for l in snap["created"]["labels"]] == [(1, 30)]
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"{name}: ok")